@@ -1,6 +1,13 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import string
+import tempfile
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
 st.set_page_config(page_title="Aadhaar Pulse Dashboard", layout="wide")
@@ -8,41 +15,115 @@ st.set_page_config(page_title="Aadhaar Pulse Dashboard", layout="wide")
 # =========================
 # UI Helper – KPI Card
 # =========================
+KPI_CARD = string.Template("""<div style="
+    flex:1 1 12rem;
+    background:$color;
+    padding:20px;
+    border-radius:15px;
+    color:white;
+    text-align:center;
+    box-shadow:0 4px 12px rgba(0,0,0,0.3);
+    ">
+    <h4>$title</h4>
+    <h2>$value</h2>
+</div>""")
+
+KPI_ROW = string.Template('<div style="display:flex;flex-wrap:wrap;gap:1rem;">$cards</div>')
+
 def kpi_card(title, value, color):
-    return f"""
-    <div style="
-        background:{color};
-        padding:20px;
-        border-radius:15px;
-        color:white;
-        text-align:center;
-        box-shadow:0 4px 12px rgba(0,0,0,0.3);
-        ">
-        <h4>{title}</h4>
-        <h2>{value}</h2>
-    </div>
-    """
+    return KPI_CARD.substitute(title=title, value=value, color=color)
+
+def kpi_row(cards):
+    return KPI_ROW.substitute(cards="".join(cards))
+
+# =========================
+# UI Helper – Chart Downsampling
+# =========================
+def downsample(frame, max_points=1000):
+    if len(frame) <= max_points:
+        return frame
+    positions = np.linspace(0, len(frame) - 1, max_points).astype(int)
+    return frame.iloc[positions]
 
 # =========================
 # Differential Privacy util
 # =========================
-def apply_dp_noise(value, epsilon=1.0):
-    noise = np.random.laplace(0, 1/epsilon)
-    return max(0, value + noise)
+@st.cache_resource
+def dp_rng():
+    return np.random.default_rng()
+
+def apply_dp_noise_batch(values, epsilon=1.0):
+    values = np.asarray(values, dtype=float)
+    noisy = dp_rng().laplace(0.0, 1.0 / epsilon, size=values.shape)
+    noisy += values
+    return np.maximum(noisy, 0.0, out=noisy)
 
 # =========================
 # Recommendation Engine
 # =========================
 def recommend_resources(predicted_updates):
-    staff = int(np.ceil(predicted_updates / 400))
-    devices = int(np.ceil(predicted_updates / 250))
-    mobile_units = int(np.ceil(predicted_updates / 1000))
+    predicted_updates = math.ceil(predicted_updates)
+    staff = -(-predicted_updates // 400)
+    devices = -(-predicted_updates // 250)
+    mobile_units = -(-predicted_updates // 1000)
     return staff, devices, mobile_units
 
+def read_table(csv_path, **read_kwargs):
+    stem = os.path.splitext(csv_path)[0]
+    options_key = json.dumps(read_kwargs, sort_keys=True, default=str).encode()
+    options_hash = hashlib.sha1(options_key).hexdigest()[:12]
+    parquet_path = f"{stem}.{options_hash}.parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        try:
+            return pd.read_parquet(parquet_path, engine="pyarrow")
+        except (OSError, ValueError):
+            pass
+    table = pd.read_csv(csv_path, engine="pyarrow", **read_kwargs)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(stem) + ".",
+            suffix=".parquet.tmp",
+            dir=os.path.dirname(parquet_path) or ".",
+        )
+        os.close(fd)
+        table.to_parquet(tmp_path, engine="pyarrow", index=False)
+        os.replace(tmp_path, parquet_path)
+        tmp_path = None
+        for stale_path in glob.glob(f"{glob.escape(stem)}.{'[0-9a-f]' * 12}.parquet"):
+            if stale_path != parquet_path:
+                os.remove(stale_path)
+    except Exception:
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return table
+
 @st.cache_data
 def load_data():
-    monthly = pd.read_csv("aadhaar_phase2_intelligence_dataset.csv")
-    forecast = pd.read_csv("aadhaar_phase3_forecast.csv")
+    monthly = read_table(
+        "aadhaar_phase2_intelligence_dataset.csv",
+        dtype={
+            "state": "category",
+            "district": "category",
+            "privacy_flag": "category",
+            "stress_level": "category",
+            "maturity_category": "category",
+            "update_total": "int32",
+            "confidence_score": "float32",
+        },
+    )
+    forecast = read_table(
+        "aadhaar_phase3_forecast.csv",
+        dtype={
+            "state": "category",
+            "district": "category",
+            "predicted_stress_level": "category",
+        },
+    )
+    monthly["month"] = pd.to_datetime(monthly["month"], format="%Y-%m")
+    monthly = monthly.sort_values(["state", "district", "month"], kind="stable").reset_index(drop=True)
     return monthly, forecast
 
 monthly, forecast_df = load_data()
@@ -50,13 +131,19 @@ monthly, forecast_df = load_data()
 # =========================
 # Data Quality Check
 # =========================
-monthly["data_quality_flag"] = False
-mask = (
-    (monthly["district"].str.lower() == "hyderabad") &
-    (monthly["state"].str.lower() != "telangana")
-)
-monthly.loc[mask, "data_quality_flag"] = True
-dq_count = monthly["data_quality_flag"].sum()
+@st.cache_data
+def compute_dq_mask(_monthly):
+    district = _monthly["district"].astype("category")
+    state = _monthly["state"].astype("category")
+    hyderabad_codes = np.flatnonzero(district.cat.categories.str.casefold() == "hyderabad")
+    telangana_codes = np.flatnonzero(state.cat.categories.str.casefold() == "telangana")
+    return (
+        np.isin(district.cat.codes.to_numpy(), hyderabad_codes) &
+        ~np.isin(state.cat.codes.to_numpy(), telangana_codes)
+    )
+
+dq_mask = compute_dq_mask(monthly)
+dq_count = int(dq_mask.sum())
 
 # =========================
 # Header
@@ -71,9 +158,18 @@ if dq_count > 0:
     st.warning(f"⚠ Detected {dq_count} records with possible administrative mismatch (legacy coding suspected).")
 
 if st.checkbox("Show administrative mismatch records"):
-    st.dataframe(monthly[monthly["data_quality_flag"]][
-        ["state", "district", "month", "update_total", "service_stress_score"]
-    ])
+    dq_records = monthly.loc[
+        dq_mask, ["state", "district", "month", "update_total", "service_stress_score"]
+    ]
+    page_size = 100
+    page_count = max(1, -(-len(dq_records) // page_size))
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    st.dataframe(
+        dq_records.iloc[(page - 1) * page_size:page * page_size],
+        column_config={"month": st.column_config.DateColumn(format="YYYY-MM")},
+    )
 
 # =========================
 # Sidebar – Privacy
@@ -93,28 +189,53 @@ else:
 # =========================
 st.sidebar.header("📍 Select Location")
 
-states = sorted(monthly["state"].unique())
+@st.cache_data
+def location_index(_monthly):
+    states = sorted(_monthly["state"].unique())
+    districts = {
+        state: sorted(group["district"].unique().tolist())
+        for state, group in _monthly.groupby("state", sort=False, observed=True)
+    }
+    return states, districts
+
+states, districts_by_state = location_index(monthly)
 state_selected = st.sidebar.selectbox("State", states)
-
-districts = sorted(monthly[monthly["state"] == state_selected]["district"].unique())
-district_selected = st.sidebar.selectbox("District", districts)
-
-district_data = monthly[
-    (monthly["state"] == state_selected) &
-    (monthly["district"] == district_selected)
-].sort_values("month")
+district_selected = st.sidebar.selectbox("District", districts_by_state[state_selected])
+
+@st.cache_resource
+def indexed_monthly(_monthly):
+    return _monthly.set_index(["state", "district"])
+
+@st.cache_resource
+def forecast_index(_forecast_df):
+    return {
+        key: group.reset_index(drop=True)
+        for key, group in _forecast_df.groupby(["state", "district"], sort=False, observed=True)
+    }
+
+location_key = (state_selected, district_selected)
+if st.session_state.get("location_key") != location_key:
+    district_index = indexed_monthly(monthly)
+    st.session_state["district_data"] = district_index.iloc[district_index.index.get_loc(location_key)]
+    st.session_state["forecast_data"] = forecast_index(forecast_df).get(
+        location_key, forecast_df.iloc[:0]
+    )
+    st.session_state["location_key"] = location_key
+
+district_data = st.session_state["district_data"]
+forecast_data = st.session_state["forecast_data"]
 
 latest = district_data.iloc[-1]
 
 # =========================
 # Apply DP
 # =========================
-stress_score = latest["service_stress_score"]
-update_total = latest["update_total"]
+dp_values = latest[["service_stress_score", "update_total"]].to_numpy(dtype=float)
 
 if use_dp:
-    stress_score = apply_dp_noise(stress_score, epsilon)
-    update_total = apply_dp_noise(update_total, epsilon)
+    dp_values = apply_dp_noise_batch(dp_values, epsilon)
+
+stress_score, update_total = dp_values
 
 # =========================
 # KPI Cards
@@ -123,45 +244,28 @@ st.subheader("📊 District Status Overview")
 
 stress_color = "#d32f2f" if latest["stress_level"] == "High" else "#f9a825" if latest["stress_level"] == "Medium" else "#2e7d32"
 
-c1, c2, c3, c4 = st.columns(4)
-
-with c1:
-    st.markdown(kpi_card("🚨 Stress Level", latest["stress_level"], stress_color), unsafe_allow_html=True)
-with c2:
-    st.markdown(kpi_card("📈 Maturity", latest["maturity_category"], "#1565c0"), unsafe_allow_html=True)
-with c3:
-    st.markdown(kpi_card("🧮 Confidence", round(latest["confidence_score"], 2), "#6a1b9a"), unsafe_allow_html=True)
-with c4:
-    st.markdown(kpi_card("⚙ Service Stress", int(stress_score), "#00838f"), unsafe_allow_html=True)
+st.markdown(kpi_row([
+    kpi_card("🚨 Stress Level", latest["stress_level"], stress_color),
+    kpi_card("📈 Maturity", latest["maturity_category"], "#1565c0"),
+    kpi_card("🧮 Confidence", round(latest["confidence_score"], 2), "#6a1b9a"),
+    kpi_card("⚙ Service Stress", int(stress_score), "#00838f"),
+]), unsafe_allow_html=True)
 
 # =========================
 # Historical Trend
 # =========================
 st.subheader("📈 Historical Update Trend")
-fig1, ax1 = plt.subplots()
-ax1.plot(district_data["month"], district_data["update_total"], marker="o")
-plt.xticks(rotation=45)
-st.pyplot(fig1)
+st.line_chart(downsample(district_data).set_index("month")["update_total"])
 
 # =========================
 # Forecast Plot
 # =========================
 st.subheader("🔮 Forecasted Update Demand")
 
-forecast_data = forecast_df[
-    (forecast_df["state"] == state_selected) &
-    (forecast_df["district"] == district_selected)
-]
-
 predicted_value = None
 
 if not forecast_data.empty:
-    fig2, ax2 = plt.subplots()
-    ax2.plot(forecast_data["forecast_month"],
-             forecast_data["predicted_update_total"],
-             marker="o", color="orange")
-    plt.xticks(rotation=45)
-    st.pyplot(fig2)
+    st.line_chart(forecast_data.set_index("forecast_month")["predicted_update_total"], color="#ffa500")
 
     predicted_value = forecast_data.iloc[-1]["predicted_update_total"]
 else:
@@ -200,20 +304,32 @@ if predicted_value:
 # =========================
 st.subheader("🚨 Top 20 High-Risk Districts")
 
-latest_month = monthly["month"].max()
-latest_data = monthly[monthly["month"] == latest_month]
-top_stress = latest_data.sort_values("service_stress_score", ascending=False).head(20)
-
-def highlight(row):
-    if row["stress_level"] == "High":
-        return ["background-color:#ffcccc"] * len(row)
-    elif row["stress_level"] == "Medium":
-        return ["background-color:#fff0b3"] * len(row)
-    else:
-        return ["background-color:#ccffcc"] * len(row)
-
-st.dataframe(top_stress[["state","district","service_stress_score","stress_level"]]
-             .style.apply(highlight, axis=1))
+@st.cache_data
+def top_risk(_monthly, k=20):
+    latest_month = _monthly["month"].max()
+    latest_data = _monthly.loc[_monthly["month"] == latest_month]
+    return latest_data.nlargest(k, "service_stress_score")[
+        ["state", "district", "service_stress_score", "stress_level"]
+    ]
+
+top_stress = top_risk(monthly)
+
+STRESS_CSS = {
+    "High": "background-color:#ffcccc",
+    "Medium": "background-color:#fff0b3",
+}
+
+def highlight(frame):
+    colors = (
+        frame["stress_level"].astype(object)
+        .map(STRESS_CSS)
+        .fillna("background-color:#ccffcc")
+        .to_numpy()
+    )
+    css = np.broadcast_to(colors[:, None], frame.shape)
+    return pd.DataFrame(css, index=frame.index, columns=frame.columns)
+
+st.dataframe(top_stress.style.apply(highlight, axis=None))
 
 # =========================
 # Privacy Transparency Panel